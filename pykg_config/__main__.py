@@ -35,7 +35,7 @@ __version__ = "$Revision: $"
 # $Source$
 
 from optparse import OptionParser, OptionError
-from os import getenv
+from os import getenv, pathsep
 import sys
 import traceback
 
@@ -193,7 +193,7 @@ def main():
             break
 
     def splitSerializedList(ls):
-        return ls.split(self._split_char())
+        return ls.split(pathsep)
 
     variable_init_spec = {
         ("pc_sysrootdir", str),
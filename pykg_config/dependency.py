@@ -39,16 +39,39 @@ package, both positive (need) and negative (conflict).
 __version__ = "$Revision: $"
 # $Source$
 
+import operator as _operator
+
 from pykg_config.operators import *
 
+# Comparison functions for each operator, called as func(other, required).
+_OPS = {ALWAYS_MATCH: lambda a, b: True,
+        LESS_THAN: _operator.lt,
+        LESS_THAN_EQUAL: _operator.le,
+        EQUAL: _operator.eq,
+        NOT_EQUAL: _operator.ne,
+        GREATER_THAN_EQUAL: _operator.ge,
+        GREATER_THAN: _operator.gt}
+
+
+def _false(a, b):
+    return False
+
 ##############################################################################
 # Dependency class
 
 class Dependency:
+    """A package name with a version restriction.
+
+    Dependencies are hashable and should not be changed after creation.
+
+    """
+    __slots__ = ('name', 'operator', 'version', '_hash')
+
     def __init__(self, name, operator, version):
         self.name = name
         self.operator = operator
         self.version = version
+        self._hash = hash((name, operator, version))
 
     def __eq__(self, other):
         if self.name == other.name and \
@@ -64,26 +87,19 @@ class Dependency:
                return True
         return False
 
+    def __hash__(self):
+        return self._hash
+
     def __str__(self):
         if self.version.is_empty():
             return self.name
         return self.name + operator_to_text(self.operator) + str(self.version)
 
+    _OPS_get = _OPS.get
+
     def meets_requirement(self, other_version):
-        if self.operator == ALWAYS_MATCH:
-            return True
-        elif self.operator == LESS_THAN:
-            return other_version.__lt__(self.version)
-        elif self.operator == LESS_THAN_EQUAL:
-            return other_version.__le__(self.version)
-        elif self.operator == EQUAL:
-            return other_version.__eq__(self.version)
-        elif self.operator == NOT_EQUAL:
-            return other_version.__ne__(self.version)
-        elif self.operator == GREATER_THAN_EQUAL:
-            return other_version.__ge__(self.version)
-        elif self.operator == GREATHER_THAN:
-            return other_version.__gt__(self.version)
+        return self._OPS_get(self.operator, _false)(other_version,
+                                                    self.version)
 
 
 # vim: tw=79
@@ -52,6 +52,9 @@ class ErrorPrinter(object):
             self.vars = {}
         self.vars[var] = value
 
+    def debug_enabled(self):
+        return Options().get_option('debug')
+
     def debug_print(self, line, args=None):
         if not Options().get_option('debug'):
             return
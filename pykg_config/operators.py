@@ -63,44 +63,33 @@ NOT_EQUAL = 5
 ALWAYS_MATCH = 6
 
 
+_operator_to_text = {ALWAYS_MATCH: ' any ',
+                     LESS_THAN: '<',
+                     LESS_THAN_EQUAL: '<=',
+                     EQUAL: '=',
+                     GREATER_THAN_EQUAL: '>=',
+                     GREATER_THAN: '>',
+                     NOT_EQUAL: '!='}
+_text_to_operator = dict((text, op) for op, text in _operator_to_text.items()
+                         if op != ALWAYS_MATCH)
+
+
 ##############################################################################
 # Support functions
 
 def text_to_operator(text):
     if not text:
         return ALWAYS_MATCH
-    elif text == '<':
-        return LESS_THAN
-    elif text == '<=':
-        return LESS_THAN_EQUAL
-    elif text == '=':
-        return EQUAL
-    elif text == '>=':
-        return GREATER_THAN_EQUAL
-    elif text == '>':
-        return GREATER_THAN
-    elif text == '!=':
-        return NOT_EQUAL
-    else:
+    try:
+        return _text_to_operator[text]
+    except KeyError:
         raise BadOperatorError(text)
 
 
 def operator_to_text(operator):
-    if operator == ALWAYS_MATCH:
-        return ' any '
-    elif operator == LESS_THAN:
-        return '<'
-    elif operator == LESS_THAN_EQUAL:
-        return '<='
-    elif operator == EQUAL:
-        return '='
-    elif operator == GREATER_THAN_EQUAL:
-        return '>='
-    elif operator == GREATER_THAN:
-        return '>'
-    elif operator == NOT_EQUAL:
-        return '!='
-    else:
+    try:
+        return _operator_to_text[operator]
+    except KeyError:
         raise BadOperatorError(str(operator))
 
 
@@ -38,7 +38,6 @@ Stores information read from a pkg-config file.
 __version__ = "$Revision: $"
 # $Source$
 
-from copy import deepcopy
 from os.path import abspath, dirname, join, normpath
 import re
 import shlex
@@ -46,7 +45,7 @@ import sys
 
 from pykg_config.errorprinter import ErrorPrinter
 from pykg_config.exceptions import ParseError
-from pykg_config.pcfile import read_pc_file
+from pykg_config.pcfile import read_pc_file, read_pc_file_summary
 from pykg_config.substitute import substitute
 from pykg_config.props import *
 from pykg_config.options import Options
@@ -118,9 +117,9 @@ class Package:
 
     def clear(self):
         """Clear all package data."""
-        self._props = deepcopy(empty_processed_props)
+        self._props = new_processed_props()
         self._vars = {}
-        self.raw_props = deepcopy(empty_raw_props)
+        self.raw_props = new_raw_props()
         self.raw_vars = {}
         self.filename = ''
 
@@ -135,6 +134,17 @@ class Package:
         """Get a variable in its raw format, as it appears in the file."""
         return self.raw_vars[var]
 
+    @staticmethod
+    def read_summary(filename, globals={}):
+        """Get the name and description of the package in a pkg-config file,
+        without loading the rest of the package.
+
+        """
+        name, description = read_pc_file_summary(filename, globals)
+        if not description:
+            description = empty_processed_props['description']
+        return name, description
+
     def sanity_check(self):
         return True
 
@@ -175,7 +185,7 @@ class Package:
                     global_variables)
 
         # Parse the data
-        self.properties = deepcopy(empty_processed_props)
+        self.properties = new_processed_props()
         self.properties['name'] = props['name']
         if props['description']:
             self.properties['description'] = props['description']
@@ -197,12 +207,15 @@ class Package:
 
     def _parse_cflags(self, value, global_variables):
         flags = shlex.split(value, posix=False)
+        # Look up the options once rather than for every flag
+        forbidden_cflags = Options().get_option('forbidden_cflags')
+        full_compatibility = Options().get_option('full_compatibility')
+        normalise_paths = Options().get_option('normalise_paths')
+        pc_sysrootdir = global_variables.get('pc_sysrootdir', None)
         for flag in flags:
             if flag.startswith('-I'):
-                if flag[2:] not in \
-                        Options().get_option('forbidden_cflags'):
+                if flag[2:] not in forbidden_cflags:
                     # Prepend pc_sysrootdir if necessary
-                    pc_sysrootdir = global_variables.get('pc_sysrootdir', None)
                     if pc_sysrootdir:
                         # Strip the leading slashes from the flag path
                         # because os.path.join() will ignore
@@ -212,13 +225,12 @@ class Package:
                                 flag[2:].strip().lstrip('/'))
                     else:
                         include_dir = flag[2:].strip()
-                    if Options().get_option('full_compatibility') and \
-                            include_dir:
+                    if full_compatibility and include_dir:
                         # Drop everything after the first space when trying
                         # to be fully compatible (sucky behaviour on Win32).
                         include_dir = include_dir.split()[0]
                     if sys.platform == 'win32':
-                        if Options().get_option('normalise_paths'):
+                        if normalise_paths:
                             include_dir = normpath(include_dir)
                         else:
                             include_dir = include_dir.replace('\\', '/')
@@ -230,6 +242,11 @@ class Package:
     def _parse_libs(self, value, global_variables, dest=''):
         # Parse lib flags
         libs = shlex.split(value)
+        # Look up the options once rather than for every flag
+        forbidden_libdirs = Options().get_option('forbidden_libdirs')
+        full_compatibility = Options().get_option('full_compatibility')
+        normalise_paths = Options().get_option('normalise_paths')
+        pc_sysrootdir = global_variables.get('pc_sysrootdir', None)
         skip_next = False
         for ii, lib in enumerate(libs):
             if skip_next:
@@ -240,10 +257,8 @@ class Package:
                 self.properties[dest + 'libs'].append(lib[2:].strip() + \
                         self.lib_suffix)
             elif lib.startswith('-L'):
-                if lib[2:] not in \
-                        Options().get_option('forbidden_libdirs'):
+                if lib[2:] not in forbidden_libdirs:
                     # Prepend pc_sysrootdir if necessary
-                    pc_sysrootdir = global_variables.get('pc_sysrootdir', None)
                     if pc_sysrootdir:
                         # Strip the leading slashes from the flag path
                         # because os.path.join() will ignore
@@ -253,12 +268,12 @@ class Package:
                                 lib[2:].strip().lstrip('/'))
                     else:
                         libpath = lib[2:].strip()
-                    if Options().get_option('full_compatibility'):
+                    if full_compatibility:
                         # Drop everything after the first space when trying
                         # to be fully compatible (sucky behaviour on Win32).
                         libpath = libpath.split()[0]
                     if sys.platform == 'win32':
-                        if Options().get_option('normalise_paths'):
+                        if normalise_paths:
                             libpath = normpath(libpath)
                         else:
                             libpath = libpath.replace('\\', '/')
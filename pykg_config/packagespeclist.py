@@ -41,23 +41,24 @@ import re
 from pykg_config.version import Version
 from pykg_config.dependency import *
 
+spec_re = re.compile(r'(?P<name>[^\s,!=<>]+)(,|\s*(?P<operator>[!=<>]+)\s*(?P<version>[^\s,]+))?',
+                     re.U)
+# Shared by all dependencies without a version restriction
+empty_version = Version()
+
 def parse_package_spec_list(value):
     """Parses a textual list of package specs into a list of Dependency
     objects containing name, and possibly a version restriction.
 
     """
     result = []
-    matches = re.findall('(?P<name>[^\s,!=<>]+)(,|\s*(?P<operator>[!=<>]+)\s*(?P<version>[^\s,]+))?',
-               value.strip(), re.U)
-
-    for package in matches:
-        name = package[0]
-        operator = text_to_operator(package[2])
-        if package[3]:
-            version = Version(package[3])
+    for m in spec_re.finditer(value.strip()):
+        operator = text_to_operator(m.group('operator'))
+        if m.group('version'):
+            version = Version(m.group('version'))
         else:
-            version = Version()
-        result.append (Dependency(name, operator, version))
+            version = empty_version
+        result.append(Dependency(m.group('name'), operator, version))
     return result
 
 
@@ -39,18 +39,31 @@ used by pkg-config.
 __version__ = "$Revision: $"
 # $Source$
 
+import os
 import re
 
 from pykg_config.errorprinter import ErrorPrinter
 from pykg_config.exceptions import ParseError
-from pykg_config.substitute import substitute
-from pykg_config.props import empty_raw_props
+from pykg_config.substitute import UndefinedVarError, substitute
+from pykg_config.props import empty_raw_props, new_raw_props
 
 # Constants
 VARIABLE = 0
 PROPERTY = 1
 empty_vars = {}
 
+# Lower-case versions of property keys, which are usually written
+# capitalised (e.g. "Name" or "Libs").
+_lower_keys = dict((key.capitalize(), key) for key in empty_raw_props)
+
+# Properties read by read_pc_file_summary
+_summary_props = ('name', 'description')
+
+# Parse results of read_pc_file, keyed by file name and global variables.
+# Each result is stored with the modification time and size of the file it
+# came from, so a changed file replaces its old entry.
+_pc_cache = {}
+
 ##############################################################################
 # Exceptions
 
@@ -107,18 +120,64 @@ class TrailingContinuationCharError(ParseError):
 def read_pc_file(filename, global_variables):
     """Read and parse it into two dictionaries (variables and properties).
 
-    Returns variables and properties.
+    Returns variables and properties. Results are cached until the file is
+    modified; the returned dictionaries are copies and may be changed by
+    the caller.
 
     """
     ErrorPrinter().set_variable('filename', filename)
-    ErrorPrinter().debug_print('Parsing %(filename)')
-    pcfile = open(filename, 'r')
-    lines = pcfile.readlines()
-    if not lines:
-        raise EmptyPackageFileError(filename)
-    raw_vars, vars, props = parse_pc_file_lines(lines, global_variables)
-    pcfile.close()
-    return raw_vars, vars, props
+    st = os.stat(filename)
+    key = (filename, globals_key(global_variables))
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _pc_cache.get(key)
+    if cached is not None and cached[0] == stamp:
+        ErrorPrinter().debug_print('Using cached parse of %(filename)')
+        result = cached[1]
+    else:
+        ErrorPrinter().debug_print('Parsing %(filename)')
+        with open(filename, 'r') as pcfile:
+            data = pcfile.read()
+        if not data:
+            raise EmptyPackageFileError(filename)
+        if trailing_cont_re.search(data):
+            raise TrailingContinuationCharError(data.rstrip().splitlines()[-1])
+        # Merge continued lines in one pass over the whole file
+        lines = cont_re.sub(' ', data).splitlines()
+        result = parse_merged_lines(lines, global_variables)
+        _pc_cache[key] = (stamp, result)
+    raw_vars, vars, props = result
+    return dict(raw_vars), dict(vars), dict(props)
+
+
+def read_pc_file_summary(filename, global_variables):
+    """Read just the name and description from a pkg-config file.
+
+    Only the lines up to those giving both properties are parsed; the rest of
+    the file is not read. Returns the name and description, with variables
+    substituted.
+
+    """
+    ErrorPrinter().set_variable('filename', filename)
+    ErrorPrinter().debug_print('Reading summary of %(filename)')
+    with open(filename, 'r') as pcfile:
+        if not os.fstat(pcfile.fileno()).st_size:
+            raise EmptyPackageFileError(filename)
+        raw_vars, vars, props = parse_merged_lines(merge_lines(pcfile, '\\'),
+                                                   global_variables,
+                                                   _summary_props)
+    try:
+        return (substitute(props['name'], vars, global_variables),
+                substitute(props['description'], vars, global_variables))
+    except UndefinedVarError:
+        # The variable may be defined further down the file
+        raw_vars, vars, props = read_pc_file(filename, global_variables)
+        return (substitute(props['name'], vars, global_variables),
+                substitute(props['description'], vars, global_variables))
+
+
+def clear_pc_cache():
+    """Forget all cached pkg-config file parse results."""
+    _pc_cache.clear()
 
 
 ##############################################################################
@@ -127,46 +186,72 @@ def read_pc_file(filename, global_variables):
 def parse_pc_file_lines(lines, globals):
     # Parse all lines from a pkg-config file, building vars and props
     # dictionaries.
+    return parse_merged_lines(merge_lines(lines, '\\'), globals)
+
+
+def parse_merged_lines(lines, globals, until=()):
+    # Parse lines that have already had continued lines merged, building vars
+    # and props dictionaries. If any properties are given in until, parsing
+    # stops as soon as all of them have a value.
     raw_vars = {}
     vars = {}
-    props = empty_raw_props.copy()
-    seen_props = []
-    for line in merge_lines(lines, '\\'):
-        raw_vars, vars, props, seen_props = parse_line(strip_comments(line).strip(),
-                                                       raw_vars, vars, props,
-                                                       seen_props, globals)
+    props = new_raw_props()
+    seen_props = set()
+    # Checked once per file to avoid building debug messages for every line
+    debug = ErrorPrinter().debug_enabled()
+    for line in lines:
+        parse_line(strip_comments(line), raw_vars, vars, props,
+                   seen_props, globals, debug)
+        if until and all(props[key] for key in until):
+            break
 
     return raw_vars, vars, props
 
 
+def globals_key(globals):
+    # Build a hashable key from the global variables. Some values (such as
+    # the search paths) are lists.
+    return frozenset((k, tuple(v) if isinstance(v, list) else v)
+                     for k, v in globals.items())
+
+
+# A continuation character, any trailing white space, and the line end
+cont_re = re.compile(r'\\[ \t]*(\r\n|\r|\n)')
+# A continuation character on the last line of a file, with no line after it
+# to merge with. A blank line after it is not an error, as in merge_lines().
+trailing_cont_re = re.compile(r'\\[ \t]*(\r\n|\r|\n)?\Z')
 def merge_lines(lines, cont_char):
     # Merge any lines ending with the given character with the following line.
-    # Return a list of lines. Raises TrailingContinuationCharError if the
-    # final line has the continuation character.
-    if lines[-1][-1] == cont_char:
-        raise TrailingContinuationCharError(line)
-    result = []
-    ii = 0
-    while ii < len(lines):
-        new_line = lines[ii].rstrip()
-        if new_line == '':
-            ii += 1
+    # Yields one merged line at a time. Raises TrailingContinuationCharError
+    # if the final line has the continuation character.
+    it = iter(lines)
+    for raw in it:
+        # Lines may or may not still have their line endings; rstrip()
+        # removes those and any trailing white space.
+        line = raw.rstrip()
+        if not line:
             continue
-        while new_line[-1] == cont_char:
-            # Drop the \n and the continuation char
-            new_line = new_line[:-2] + ' '
-            ii += 1
-            new_line += lines[ii].rstrip()
-        result.append(new_line)
-        ii += 1
-    return result
-
-
-def parse_line(line, raw_vars, vars, props, seen_props, globals):
+        if not line.endswith(cont_char):
+            # The common case: nothing to merge
+            yield line
+            continue
+        parts = []
+        while line.endswith(cont_char):
+            # Drop the continuation char and join with the next line
+            parts.append(line[:-1])
+            next_line = next(it, None)
+            if next_line is None:
+                raise TrailingContinuationCharError(line)
+            line = next_line.rstrip()
+        parts.append(line)
+        yield ' '.join(parts)
+
+
+def parse_line(line, raw_vars, vars, props, seen_props, globals, debug=True):
     # Parse a single line from the file, adding its value to the props or vars
-    # dictionary as appropriate.
+    # dictionary as appropriate. The dictionaries are modified in place.
     if not line:
-        return raw_vars, vars, props, seen_props
+        return
     key, value, type = split_pc_file_line(line)
     # Check first if it's one of the known keys.
     if type == VARIABLE:
@@ -175,63 +260,70 @@ def parse_line(line, raw_vars, vars, props, seen_props, globals):
         if key in vars:
             raise MultiplyDefinedValueError(key)
         if key in globals:
-            ErrorPrinter().debug_print('Adding %s -> %s to vars from globals',
-                                       (key, value))
+            if debug:
+                ErrorPrinter().debug_print('Adding %s -> %s to vars from globals',
+                                           (key, value))
             raw_vars[key] = value.strip ()
             vars[key] = substitute (globals[key], vars, globals)
         else:
-            ErrorPrinter().debug_print('Adding %s -> %s to vars', (key, value))
-            raw_vars[key] = value.strip ()
-            vars[key] = substitute (value.strip(), vars, globals)
+            if debug:
+                ErrorPrinter().debug_print('Adding %s -> %s to vars',
+                                           (key, value))
+            value = value.strip()
+            raw_vars[key] = value
+            vars[key] = substitute(value, vars, globals)
     elif type == PROPERTY:
         if key in seen_props:
             raise MultiplyDefinedValueError(key)
-        if key.lower() in empty_raw_props:
+        lower_key = _lower_keys.get(key)
+        if lower_key is None:
+            lower_key = key.lower()
+            # Only remember spellings of known keys, so that unknown keys in
+            # files do not fill up the dictionary
+            if lower_key in empty_raw_props:
+                _lower_keys[key] = lower_key
+        if lower_key in empty_raw_props:
             if value is None:
-                value = empty_raw_props[key.lower()]
-            ErrorPrinter().debug_print('Adding %s -> %s to props', (key, value))
-            props[key.lower ()] = value
-            seen_props.append(key)
+                value = empty_raw_props[lower_key]
+            if debug:
+                ErrorPrinter().debug_print('Adding %s -> %s to props',
+                                           (key, value))
+            props[lower_key] = value
+            seen_props.add(key)
         else:
             # As per the original pkg-config, don't raise errors on unknown
             # keys because they may be from future additions to the file
             # format. But log an error
-            ErrorPrinter().debug_print('Unknown key/value in %(filename)s:\n%s: %s',
-                                       (key, value))
+            if debug:
+                ErrorPrinter().debug_print('Unknown key/value in %(filename):\n%s: %s',
+                                           (key, value))
     else:
         # Probably a malformed line. Ignore it.
         pass
-    return raw_vars, vars, props, seen_props
 
 
 def strip_comments(line):
-    # Strip comments from a line, returning the uncommented part or a blank
-    # string if the whole line was a comment.
-    commentStart = line.find('#')
-    if commentStart == -1:
-        return line
-    else:
-        return line[:commentStart]
+    # Strip comments and surrounding white space from a line, returning the
+    # uncommented part or a blank string if the whole line was a comment.
+    return line.partition('#')[0].strip()
 
 
-property_re = re.compile('(?P<key>[\w.]+):\s*(?P<value>.+)?', re.U)
-variable_re = re.compile('(?P<var>[\w.]+)=\s*(?P<value>.+)?', re.U)
+line_re = re.compile(r'(?P<key>[\w.]+)(?P<sep>[:=])\s*(?P<value>.+)?', re.U)
 def split_pc_file_line(line):
     # Split a line into key and value, and determine if it is a property or a
-    # variable.
-    m = property_re.match(line)
-    if m is not None:
-        return m.group('key'), m.group('value'), PROPERTY
-
-    m = variable_re.match(line)
+    # variable. The character following the key tells which: ':' for a
+    # property, '=' for a variable.
+    m = line_re.match(line)
     if m is not None:
+        if m.group('sep') == ':':
+            return m.group('key'), m.group('value'), PROPERTY
         if m.group('value') is None:
-            return m.group('var'), '', VARIABLE
+            return m.group('key'), '', VARIABLE
         else:
-            return m.group('var'), m.group('value'), VARIABLE
+            return m.group('key'), m.group('value'), VARIABLE
 
     # Gloss over malformed lines (that's what pkg-config does).
-    ErrorPrinter().debug_print('Malformed line: {0}'.format(line))
+    ErrorPrinter().debug_print('Malformed line: %s', (line,))
     return None, None, None
 
 
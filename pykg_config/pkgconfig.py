@@ -39,6 +39,7 @@ import os
 import re
 import subprocess
 import sys
+from functools import lru_cache
 from shutil import which
 
 pykg_config_package_name = "pykg_config"
@@ -56,13 +57,15 @@ def discover_pkg_config_impl(path=None, impls=None):
     raise FileNotFoundError("No pkg-config impl is installed in your system")
 
 
-discovered_pkg_config_command = None
-
+@lru_cache(maxsize=None)
 def _get_pkg_config_impl():
-    global discovered_pkg_config_command
-    if discovered_pkg_config_command is None:
-        discovered_pkg_config_command = discover_pkg_config_impl()
-    return discovered_pkg_config_command
+    return discover_pkg_config_impl()
+
+# Environment variables that change what the real pkg-config reports
+_pkgconfig_env_vars = ('PKG_CONFIG_PATH', 'PKG_CONFIG_LIBDIR',
+                       'PKG_CONFIG_SYSROOT_DIR')
+
+_missing = object()
 
 class Env:
     __slots__ = ("patch", "backup")
@@ -70,23 +73,23 @@ class Env:
         self.patch = kwargs
         self.backup = None
     def __enter__(self):
-        self.backup = os.environ.copy()
+        # Only the patched variables need to be saved
+        self.backup = {k: os.environ.get(k, _missing) for k in self.patch}
         os.environ.update(self.patch)
         return self
     def __exit__(self, exc_type, exc_value, traceback):
-        os.environ = self.backup
+        for k, v in self.backup.items():
+            if v is _missing:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
 
 def _call_process(args):
-    process = subprocess.Popen(
-        args, stdout=subprocess.PIPE, stderr=subprocess.PIPE
-    )
-    output = process.communicate()
-    output = (
-        output[0].strip().decode("utf-8"),
-        output[1].strip().decode("utf-8"),
-    )
-    return_code = process.returncode
-    return output[0], output[1], return_code
+    process = subprocess.run(args, stdout=subprocess.PIPE,
+                             stderr=subprocess.PIPE, check=False)
+    return (process.stdout.decode("utf-8", "replace").strip(),
+            process.stderr.decode("utf-8", "replace").strip(),
+            process.returncode)
 
 def call_process(args, **env):
     if env:
@@ -103,18 +106,33 @@ def call_pykgconfig(*args, **env):
         (sys.executable, "-m", pykg_config_package_name) + args, **env
     )
 
+def call_pkgconfig_get_str(*args, **env):
+    return call_pkgconfig(*args, **env)[0]
+
 def call_pkgconfig_get_lines(*args, **env):
-    return call_pkgconfig(*args, **env).splitlines()
+    return call_pkgconfig_get_str(*args, **env).splitlines()
+
+@lru_cache(maxsize=128)
+def _query_default_pc_var(args, env_key):
+    # Queries of the real pkg-config's own variables do not change between
+    # calls, as long as the environment it reads is the same; env_key only
+    # tells those environments apart in the cache.
+    return call_pkgconfig_get_str(*args)
+
+def _pkgconfig_env_key():
+    return tuple(os.environ.get(k) for k in _pkgconfig_env_vars)
 
 def get_default_pc_vars_names():
-    return call_pkgconfig_get_lines("--print-variables", "pkg-config")
+    return _query_default_pc_var(("--print-variables", "pkg-config"),
+                                 _pkgconfig_env_key()).splitlines()
 
 def get_default_pc_vars_kv_pairs(*var_names):
     if not var_names:
         var_names = get_default_pc_vars_names()
 
     for var_name in var_names:
-        res = call_pkgconfig_get_str("--variable", var_name, "pkg-config")
+        res = _query_default_pc_var(("--variable", var_name, "pkg-config"),
+                                    _pkgconfig_env_key())
         if res:
             yield var_name, res
         else:
@@ -36,8 +36,11 @@
 __version__ = "$Revision: $"
 # $Source$
 
-from os import getenv, listdir
-from os.path import isdir, isfile, join, split, splitext
+from concurrent.futures import ThreadPoolExecutor
+from os import altsep, getenv, pathsep, scandir, sep
+from os.path import abspath, isabs, isdir, isfile, join, normcase, normpath, \
+        realpath
+import re
 import sys
 if sys.platform == 'win32':
     if sys.version_info[0] < 3:
@@ -50,6 +53,7 @@ from pykg_config.exceptions import PykgConfigError
 from pykg_config.options import Options
 from pykg_config.errorprinter import ErrorPrinter
 from pykg_config.package import Package
+from pykg_config.pcfile import globals_key
 from pykg_config.substitute import UndefinedVarError
 
 try:
@@ -120,14 +124,29 @@ thisArchTriple = TargetTriple()
 # PkgSearcher object
 
 class PkgSearcher:
+    # Matches .pc file names, giving the package name. Windows file names are
+    # not case sensitive, so neither is the match there.
+    _pc_re = re.compile(r'(.+)\.pc\Z',
+                        re.IGNORECASE if sys.platform == 'win32' else 0)
+
     def __init__(self, globals):
         # This is a dictionary of packages found in the search path. Each
         # package name is linked to a list of full paths to .pc files, in
         # order of priority. Earlier in the list is preferred over later.
+        # Directories are only scanned when all packages are needed;
+        # individual packages are looked up directly in each search
+        # directory and added as they are found.
         self._known_pkgs = {}
+        # All paths in _known_pkgs, for fast duplicate checks
+        self._known_paths = set()
+        self._scanned_all = False
+        # Packages already loaded, keyed by absolute path and global variables
+        self._pkg_cache = {}
         self.globals = globals
+        # Avoid building debug messages when they will not be printed
+        self._debug = ErrorPrinter().debug_enabled()
 
-        self._init_search_dirs()
+        self._collect_search_dirs()
 
     def search_for_package(self, dep, globals):
         """Search for a package matching the given dependency specification
@@ -137,24 +156,26 @@ class PkgSearcher:
         Returns a parsed package object.
 
         """
+        printer = ErrorPrinter()
         # Get a list of pc files matching the package name
-        if isfile(dep.name) and splitext(dep.name)[1] == '.pc':
+        if dep.name.endswith('.pc') and isfile(dep.name):
             # No need to search for a pc file
-            ErrorPrinter().debug_print('Using provided pc file %s', (dep.name))
+            printer.debug_print('Using provided pc file %s', (dep.name))
             pcfiles = [dep.name]
         else:
-            ErrorPrinter().debug_print('Searching for package matching %s', (dep))
+            printer.debug_print('Searching for package matching %s', (dep))
             pcfiles = self.search_for_pcfile(dep.name)
-        ErrorPrinter().debug_print('Found .pc files: %s', (str(pcfiles)))
+        if self._debug:
+            printer.debug_print('Found .pc files: %s', (str(pcfiles)))
         if not pcfiles:
             raise PackageNotFoundError(str(dep))
         # Filter the list by those files that meet the version specification
         pkgs = []
         for pcfile in pcfiles:
             try:
-                pkgs.append(Package(pcfile, globals))
+                pkgs.append(self._load_package(pcfile, globals))
             except IOError as e:
-                ErrorPrinter().verbose_error("Failed to open '{0}': \
+                printer.verbose_error("Failed to open '{0}': \
 {1}".format(pcfile, e.strerror))
                 continue
             except UndefinedVarError as e:
@@ -167,8 +188,9 @@ class PkgSearcher:
             raise NoOpenableFilesError(str(dep))
         pkgs = [pkg for pkg in pkgs \
                 if dep.meets_requirement(pkg.properties['version'])]
-        ErrorPrinter().debug_print('Filtered to %s',
-                                   ([pkg.properties['name'] for pkg in pkgs]))
+        if self._debug:
+            printer.debug_print('Filtered to %s',
+                                ([pkg.properties['name'] for pkg in pkgs]))
         if not pkgs:
             raise PackageNotFoundError(str(dep))
         return pkgs[0]
@@ -178,27 +200,28 @@ class PkgSearcher:
         package name. If a matching pkg-config file cannot be found,
         an empty list will be returned.
 
-        The dictionary of known packages is stored in _known_pkgs and is
-        initialised by calling init_search_dirs().
+        Files found are remembered in _known_pkgs.
 
         """
-        ErrorPrinter().debug_print('Looking for files matching %s', (pkgname))
-        if Options().get_option('prefer_uninstalled'):
-            if pkgname + '-uninstalled' in self._known_pkgs:
+        printer = ErrorPrinter()
+        options = Options()
+        printer.debug_print('Looking for files matching %s', (pkgname))
+        if options.get_option('prefer_uninstalled'):
+            uninstalled = self._find_pcfiles(pkgname + '-uninstalled')
+            if uninstalled:
                 # Prefer uninstalled version of a package
-                ErrorPrinter().debug_print('Using uninstalled package %s',
-                                           (self._known_pkgs[pkgname + '-uninstalled']))
-                return self._known_pkgs[pkgname + '-uninstalled']
-            elif Options().get_option('uninstalled_only'):
-                ErrorPrinter().debug_print('Uninstalled only, no suitable package.')
+                printer.debug_print('Using uninstalled package %s',
+                                    (uninstalled))
+                return uninstalled
+            elif options.get_option('uninstalled_only'):
+                printer.debug_print('Uninstalled only, no suitable package.')
                 return []
-        if pkgname in self._known_pkgs:
-            ErrorPrinter().debug_print('Using any package: %s',
-                             (self._known_pkgs[pkgname]))
-            return self._known_pkgs[pkgname]
+        pcfiles = self._find_pcfiles(pkgname)
+        if pcfiles:
+            printer.debug_print('Using any package: %s', (pcfiles))
         else:
-            ErrorPrinter().debug_print('No suitable package found')
-            return []
+            printer.debug_print('No suitable package found')
+        return pcfiles
 
     def known_packages_list(self):
         """Return a list of all packages found on the system, giving a name and
@@ -206,73 +229,97 @@ class PkgSearcher:
         errors encountered.
 
         """
-        result = []
         errors = []
-        for pkgname in self._known_pkgs:
-            # Use the highest-priority version of the package
+        return list(self.iter_known_packages(errors)), errors
+
+    def iter_known_packages(self, errors):
+        """Iterate over all packages found on the system, giving a name and a
+        description (from the .pc file) for each. Each file is read as it is
+        reached, so callers can start output straight away. Any errors
+        encountered are appended to the errors list.
+
+        """
+        printer = ErrorPrinter()
+        self._scan_all_dirs()
+        for pkgname, pcfiles in self._known_pkgs.items():
+            # Use the highest-priority version of the package. Only the name
+            # and description are needed, so the package is not fully loaded.
             try:
-                pkg = Package(self._known_pkgs[pkgname][0])
+                name, description = Package.read_summary(pcfiles[0], {})
             except IOError as e:
-                ErrorPrinter().verbose_error("Failed to open '{0}': \
-{1}".format(self._known_pkgs[pkgname][0], e.strerror))
+                printer.verbose_error("Failed to open '{0}': \
+{1}".format(pcfiles[0], e.strerror))
                 continue
             except UndefinedVarError as e:
                 errors.append("Variable '{0}' not defined in '{1}'".format(e,
-                    self._known_pkgs[pkgname][0]))
+                    pcfiles[0]))
                 continue
-            result.append((pkgname, pkg.properties['name'], pkg.properties['description']))
-        return result, errors
-
-    def _init_search_dirs(self):
+            yield pkgname, name, description
+
+    def _load_package(self, pcfile, globals):
+        # Get the package for a .pc file, only loading it the first time.
+        key = (abspath(pcfile), globals_key(globals))
+        if key not in self._pkg_cache:
+            self._pkg_cache[key] = Package(pcfile, globals)
+        return self._pkg_cache[key]
+
+    def _find_pcfiles(self, name):
+        # Get the list of .pc files for a package name, in order of priority,
+        # checking for the file directly in each search directory if it has
+        # not been looked up before. Only file names can match, as when
+        # scanning; a name with a path in it would find files outside the
+        # search directories.
+        if isabs(name) or sep in name or (altsep and altsep in name):
+            return []
+        if name not in self._known_pkgs and not self._scanned_all:
+            filename = name + '.pc'
+            candidates = [join(d, filename) for d in self._search_dirs]
+            self._known_pkgs[name] = [c for c in candidates if isfile(c)]
+            self._known_paths.update(self._known_pkgs[name])
+        return self._known_pkgs.get(name, [])
+
+    def _scan_all_dirs(self):
+        # Add every .pc file in the search directories to the known packages.
+        if self._scanned_all:
+            return
+        # Start again so that packages looked up and not found are dropped
+        self._known_pkgs = {}
+        self._known_paths = set()
+        # Only read directories that are there under another name (e.g. lib
+        # and lib64 when they are the same directory) once
+        search_dirs = self._unique_dirs(self._search_dirs, realpath)
+        if search_dirs:
+            # Scan in parallel, but merge the results in priority order
+            with ThreadPoolExecutor(max_workers=min(8,
+                    len(search_dirs))) as ex:
+                for pcfiles in ex.map(self._scan_dir, search_dirs):
+                    self._append_packages(pcfiles)
+        self._scanned_all = True
+
+    def _collect_search_dirs(self):
+        # Build the list of directories to search for .pc files, in order of
+        # priority.
+        self._search_dirs = []
         # Append dirs in PKG_CONFIG_PATH
-        if "config_path" in self.globals and self.globals["config_path"]:
-            for d in self.globals["config_path"]:
-                if not d or not isdir(d):
-                    continue
-                self._append_packages(d)
+        for d in self.globals.get("config_path") or ():
+            if d:
+                self._search_dirs.append(d)
         # Append dirs in PKG_CONFIG_LIBDIR
-        if "config_libdir" in self.globals and self.globals["config_libdir"]:
-            for d in self.globals["config_libdir"]:
-                if not d or not isdir(d):
-                    continue
-                self._append_packages(d)
+        for d in self.globals.get("config_libdir") or ():
+            if d:
+                self._search_dirs.append(d)
         if sys.platform == 'win32':
-            key_path = 'Software\\pkg-config\\PKG_CONFIG_PATH'
-            for root in ((_winreg.HKEY_CURRENT_USER, 'HKEY_CURRENT_USER'),
-                         (_winreg.HKEY_LOCAL_MACHINE, 'HKEY_LOCAL_MACHINE')):
-                try:
-                    key = _winreg.OpenKey(root[0], key_path)
-                except WindowsError as e:
-                    ErrorPrinter().debug_print('Failed to add paths from \
-{0}\\{1}: {2}'.format(root[1], key_path, e))
-                    continue
-                try:
-                    num_subkeys, num_vals, modified = _winreg.QueryInfoKey(key)
-                    for ii in range(num_vals):
-                        name, val, type = _winreg.EnumValue(key, ii)
-                        if type == _winreg.REG_SZ and isdir(val):
-                            self._append_packages(val)
-                except WindowsError as e:
-                    ErrorPrinter().debug_print('Failed to add paths from \
-{0}\\{1}: {2}'.format(root[1], key_path, e))
-                finally:
-                    _winreg.CloseKey(key)
+            self._search_dirs += self._registry_dirs()
         # Default path: If a hard-coded path has been set, use that (excluding
         # paths that don't exist)
-        if "prefix" in self.globals:
-            prefix = self.globals["prefix"]
-        else:
-            prefix = sys.prefix
+        prefix = self.globals.get("prefix", sys.prefix)
         if pc_path:
-            for d in pc_path.split(self._split_char()):
-                if d and isdir(d):
-                    self._append_packages(d)
+            for d in pc_path.split(pathsep):
+                if d:
+                    self._search_dirs.append(d)
         # Default path: Else append prefix/lib/pkgconfig, prefix/share/pkgconfig
         else:
-            if Options().get_option('is_64bit'):
-                suffix = '64'
-            else:
-                suffix = ''
+            suffix = '64' if Options().get_option('is_64bit') else ''
             dirs2check = (
                 join(prefix, 'lib' + suffix),
                 join(prefix, 'lib', str(thisArchTriple)),
@@ -282,46 +329,97 @@ class PkgSearcher:
             for d in dirs2check:
                 d = join(d, "pkgconfig")
                 if isdir(d):
-                    self._append_packages(d)
+                    self._search_dirs.append(d)
+        # Drop directories already in the list under the same spelling,
+        # keeping the first, highest-priority entry. This is done on the
+        # names alone; resolving links is left until a full scan, where a
+        # duplicate directory would be read twice.
+        self._search_dirs = self._unique_dirs(self._search_dirs,
+                                              lambda d: normcase(normpath(d)))
+
+    def _unique_dirs(self, dirs, key):
+        # Get the directories with those that give the same key as an earlier
+        # one removed, keeping their order.
+        seen = set()
+        result = []
+        for d in dirs:
+            k = key(d)
+            if k not in seen:
+                seen.add(k)
+                result.append(d)
+        return result
+
+    def _registry_dirs(self):
+        # Get the directories listed in the registry, current user first.
+        # They are added to the search directories in one go, where
+        # duplicates are dropped before any directory is scanned.
+        key_path = 'Software\\pkg-config\\PKG_CONFIG_PATH'
+        result = []
+        for root, root_name in ((_winreg.HKEY_CURRENT_USER,
+                                 'HKEY_CURRENT_USER'),
+                                (_winreg.HKEY_LOCAL_MACHINE,
+                                 'HKEY_LOCAL_MACHINE')):
+            try:
+                key = _winreg.OpenKey(root, key_path)
+            except WindowsError as e:
+                ErrorPrinter().debug_print('Failed to add paths from \
+%s\\%s: %s', (root_name, key_path, e))
+                continue
+            try:
+                num_subkeys, num_vals, modified = _winreg.QueryInfoKey(key)
+                for ii in range(num_vals):
+                    name, val, type = _winreg.EnumValue(key, ii)
+                    if type == _winreg.REG_SZ:
+                        result.append(val)
+            except WindowsError as e:
+                ErrorPrinter().debug_print('Failed to add paths from \
+%s\\%s: %s', (root_name, key_path, e))
+            finally:
+                _winreg.CloseKey(key)
+        return result
+
+    def _append_packages(self, pcfiles):
+        # Add (name, path) pairs for .pc files to the known packages. Paths
+        # are appended, so as long as directories are added in order of
+        # priority, each list in _known_pkgs stays in priority order and
+        # never needs sorting.
+        printer = ErrorPrinter()
+        for name, full_path in pcfiles:
+            if full_path in self._known_paths:
+                continue
+            self._known_paths.add(full_path)
+            if name in self._known_pkgs:
+                self._known_pkgs[name].append(full_path)
+                if self._debug:
+                    printer.debug_print('Package %s has a duplicate file: %s',
+                                        (name, self._known_pkgs[name]))
+            else:
+                self._known_pkgs[name] = [full_path]
 
-    def _append_packages(self, d):
+    def _scan_dir(self, d):
+        # Get a list of (name, path) pairs for all .pc files in a directory.
+        # Paths that cannot be read as a directory (including ones that do
+        # not exist) are skipped. Does not touch the searcher's state, so
+        # directories can be scanned in parallel.
+        try:
+            entries = scandir(d)
+        except OSError as e:
+            ErrorPrinter().debug_print('Skipping search path %s: %s',
+                                       (d, e.strerror))
+            return []
         ErrorPrinter().debug_print('Adding .pc files from %s to known packages',
                                    (d))
-        files = listdir(d)
-        for filename in files:
-            if filename.endswith('.pc'):
-                # Test if the file can be opened (pkg-config glosses over,
-                # e.g. links that are now dead, as if they were never there).
-                full_path = join(d, filename)
-                name = filename[:-3]
-                if name in self._known_pkgs:
-                    if full_path not in self._known_pkgs[name]:
-                        self._known_pkgs[name].append(full_path)
-                        ErrorPrinter().debug_print('Package %s has a duplicate file: %s',
-                                                   (name, self._known_pkgs[name]))
-                else:
-                    self._known_pkgs[name] = [full_path]
-
-    def _split_char(self):
-        # Get the character used to split a list of directories.
-        if sys.platform == 'win32':
-            return ';'
-        return ':'
-
-    def _can_open_file(self, filename):
-        try:
-            result = open(filename, 'r')
-        except IOError as e:
-            ErrorPrinter().debug_print('Could not open {0}'.format(filename))
-            search_string = Options().get_option('search_string').split()
-            if (not search_string and \
-                    Options().get_option('command') == 'list-all') or \
-                    True in [p.startswith(split(filename)[-1].split('.')[0]) \
-                                for p in search_string]:
-                ErrorPrinter().verbose_error("Failed to open '{0}': {1}".format(filename,
-                                                                                e.strerror))
-            return False
-        return True
+        result = []
+        match = self._pc_re.match
+        with entries:
+            for entry in entries:
+                m = match(entry.name)
+                # pkg-config glosses over files that cannot be used, such as
+                # links that are now dead, as if they were never there.
+                # is_file() usually needs no extra system call.
+                if m and entry.is_file():
+                    result.append((m.group(1), entry.path))
+        return result
 
 
 # vim: tw=79
@@ -66,6 +66,25 @@ empty_processed_props = {'name': '',
                          'private.libs': [],
                          'private.libpaths': [],
                          'private.otherlibs': []}
+_processed_list_props = [key for key in empty_processed_props
+                         if isinstance(empty_processed_props[key], list)]
+
+
+def new_raw_props():
+    """Create a new raw property dictionary containing the empty values."""
+    return empty_raw_props.copy()
+
+
+def new_processed_props():
+    """Create a new processed property dictionary containing the empty
+    values. This is much cheaper than a deep copy of empty_processed_props.
+
+    """
+    props = empty_processed_props.copy()
+    for key in _processed_list_props:
+        props[key] = []
+    props['version'] = Version()
+    return props
 
 
 # vim: tw=79
@@ -96,6 +96,14 @@ class Version:
             return True
         return False
 
+    def __hash__(self):
+        # Trailing zero components do not affect equality, so they must not
+        # affect the hash either.
+        comps = list(self.comps)
+        while comps and comps[-1] == 0:
+            comps.pop()
+        return hash(tuple(comps))
+
     def __gt__(self, other):
         if self._compare_components(other.comps) == 1:
             return True
@@ -36,14 +36,19 @@ __version__ = "$Revision: $"
 
 import os
 import re
+import shutil
 import subprocess
+import sys
+import tempfile
 import unittest
 
 from pykg_config import packagespeclist
+from pykg_config import pcfile
 from pykg_config import substitute
 from pykg_config import dependency
 from pykg_config import version
-from pykg_config.pkgconfig import call_pykgconfig
+from pykg_config.pkgsearcher import PkgSearcher
+from pykg_config.pkgconfig import Env, call_process, call_pykgconfig
 
 
 class TestVersion(unittest.TestCase):
@@ -91,6 +96,36 @@ class TestVersion(unittest.TestCase):
         self.assertFalse(versions[0] > versions[1])
         self.assertFalse(versions[0] > versions[3])
 
+    def test_hash(self):
+        self.assertEqual(hash(version.Version('2.3')),
+                         hash(version.Version('2.3.0')))
+        self.assertEqual(hash(version.Version()), hash(version.Version('')))
+
+class TestDependency(unittest.TestCase):
+    def test_meets_requirement(self):
+        v = version.Version('2.3')
+        cases = [(dependency.ALWAYS_MATCH, '0', True),
+                 (dependency.LESS_THAN, '2.4', True),
+                 (dependency.LESS_THAN, '2.3', False),
+                 (dependency.LESS_THAN_EQUAL, '2.3', True),
+                 (dependency.EQUAL, '2.3.0', True),
+                 (dependency.EQUAL, '2.4', False),
+                 (dependency.NOT_EQUAL, '2.4', True),
+                 (dependency.GREATER_THAN_EQUAL, '2.3', True),
+                 (dependency.GREATER_THAN, '2.2', True),
+                 (dependency.GREATER_THAN, '2.3', False)]
+        for op, req, result in cases:
+            dep = dependency.Dependency('blag', op, version.Version(req))
+            self.assertEqual(dep.meets_requirement(v), result)
+
+    def test_hash(self):
+        deps = set([dependency.Dependency('blag', dependency.EQUAL,
+                                          version.Version('2.3')),
+                    dependency.Dependency('blag', dependency.EQUAL,
+                                          version.Version('2.3.0'))])
+        self.assertEqual(len(deps), 1)
+
+
 class TestPackage(unittest.TestCase):
     def test_parse_package_spec_list(self):
         parsed = packagespeclist.parse_package_spec_list('blag < 2.3, \
@@ -106,6 +141,146 @@ class TestPackage(unittest.TestCase):
         self.assertEqual(parsed, expected)
 
 
+class TestPcFile(unittest.TestCase):
+    def test_merge_lines(self):
+        lines = ['Name: blag\n', '\n', 'Libs: -lblag \\\n', '  -lblerg\\\n',
+                 '-lblork\n']
+        self.assertEqual(list(pcfile.merge_lines(lines, '\\')),
+                         ['Name: blag', 'Libs: -lblag    -lblerg -lblork'])
+
+    def test_trailing_continuation_char(self):
+        lines = ['Name: blag\n', 'Libs: -lblag \\']
+        self.assertRaises(pcfile.TrailingContinuationCharError, list,
+                          pcfile.merge_lines(lines, '\\'))
+
+    def test_split_pc_file_line(self):
+        self.assertEqual(pcfile.split_pc_file_line('Libs: -lblag'),
+                         ('Libs', '-lblag', pcfile.PROPERTY))
+        self.assertEqual(pcfile.split_pc_file_line('Cflags:'),
+                         ('Cflags', None, pcfile.PROPERTY))
+        self.assertEqual(pcfile.split_pc_file_line('prefix= /usr'),
+                         ('prefix', '/usr', pcfile.VARIABLE))
+        self.assertEqual(pcfile.split_pc_file_line('blag='),
+                         ('blag', '', pcfile.VARIABLE))
+        self.assertEqual(pcfile.split_pc_file_line('blag blerg'),
+                         (None, None, None))
+
+    def test_read_pc_file_cache(self):
+        filename = os.path.join(os.path.dirname(__file__), 'unittests1.pc')
+        pcfile.clear_pc_cache()
+        raw_vars, vars, props = pcfile.read_pc_file(filename, {})
+        self.assertEqual(props['name'], 'UnitTests1')
+        props['name'] = 'changed'
+        raw_vars, vars, props = pcfile.read_pc_file(filename, {})
+        self.assertEqual(props['name'], 'UnitTests1')
+
+    def test_read_pc_file_cache_invalidation(self):
+        d = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, d)
+        filename = os.path.join(d, 'blag.pc')
+        with open(filename, 'w') as f:
+            f.write('Name: blag\n')
+        pcfile.clear_pc_cache()
+        pcfile.read_pc_file(filename, {})
+        self.assertEqual(len(pcfile._pc_cache), 1)
+        cached = list(pcfile._pc_cache.values())[0]
+        # A second read is a cache hit
+        pcfile.read_pc_file(filename, {})
+        self.assertEqual(len(pcfile._pc_cache), 1)
+        self.assertTrue(list(pcfile._pc_cache.values())[0] is cached)
+        # Different global variables are parsed separately
+        pcfile.read_pc_file(filename, {'blag': 'blerg'})
+        self.assertEqual(len(pcfile._pc_cache), 2)
+        # A modified file is parsed again, replacing its old entry
+        with open(filename, 'w') as f:
+            f.write('Name: blerg\n')
+        st = os.stat(filename)
+        os.utime(filename, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+        raw_vars, vars, props = pcfile.read_pc_file(filename, {})
+        self.assertEqual(props['name'], 'blerg')
+        self.assertEqual(len(pcfile._pc_cache), 2)
+        # A change of size is noticed even if the time stays the same
+        st = os.stat(filename)
+        with open(filename, 'w') as f:
+            f.write('Name: blergh\n')
+        os.utime(filename, ns=(st.st_atime_ns, st.st_mtime_ns))
+        raw_vars, vars, props = pcfile.read_pc_file(filename, {})
+        self.assertEqual(props['name'], 'blergh')
+        self.assertEqual(len(pcfile._pc_cache), 2)
+
+    def test_read_pc_file_continued_lines(self):
+        d = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, d)
+        filename = os.path.join(d, 'blag.pc')
+        with open(filename, 'w') as f:
+            f.write('Name: blag\nCflags: -Iblag \\\n  -Iblerg\n'
+                    'Libs: -lblag \\\n\n')
+        raw_vars, vars, props = pcfile.read_pc_file(filename, {})
+        self.assertEqual(props['cflags'], '-Iblag    -Iblerg')
+        self.assertEqual(props['libs'], '-lblag')
+        # Both readers merge continued lines the same way
+        self.assertEqual(pcfile.read_pc_file_summary(filename, {}),
+                         ('blag', ''))
+        filename = os.path.join(d, 'blerg.pc')
+        with open(filename, 'w') as f:
+            f.write('Name: blerg\nLibs: -lblerg \\\n')
+        self.assertRaises(pcfile.TrailingContinuationCharError,
+                          pcfile.read_pc_file, filename, {})
+        self.assertRaises(pcfile.TrailingContinuationCharError,
+                          pcfile.read_pc_file_summary, filename, {})
+
+    def test_read_pc_file_summary(self):
+        filename = os.path.join(os.path.dirname(__file__), 'unittests1.pc')
+        self.assertEqual(pcfile.read_pc_file_summary(filename, {}),
+                         ('UnitTests1', 'File for unit tests,'))
+        d = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, d)
+        filename = os.path.join(d, 'blag.pc')
+        open(filename, 'w').close()
+        self.assertRaises(pcfile.EmptyPackageFileError,
+                          pcfile.read_pc_file_summary, filename, {})
+        self.assertRaises(pcfile.EmptyPackageFileError,
+                          pcfile.read_pc_file, filename, {})
+
+
+class TestPkgSearcher(unittest.TestCase):
+    def setUp(self):
+        self.dirs = [tempfile.mkdtemp(), tempfile.mkdtemp()]
+        self.pcfiles = []
+        for d in self.dirs:
+            filename = os.path.join(d, 'blag.pc')
+            with open(filename, 'w') as f:
+                f.write('Name: blag\nDescription: blag\nVersion: 1\n')
+            self.pcfiles.append(filename)
+
+    def tearDown(self):
+        for d in self.dirs:
+            shutil.rmtree(d)
+
+    def test_priority_order(self):
+        searcher = PkgSearcher({'config_path': self.dirs})
+        self.assertEqual(searcher.search_for_pcfile('blag'), self.pcfiles)
+        searcher = PkgSearcher({'config_path': self.dirs})
+        searcher.known_packages_list()
+        self.assertEqual(searcher.search_for_pcfile('blag'), self.pcfiles)
+
+    def test_append_packages(self):
+        searcher = PkgSearcher({'config_path': self.dirs})
+        searcher.search_for_pcfile('blag')
+        blerg = os.path.join(self.dirs[0], 'blerg.pc')
+        searcher._append_packages([('blag', self.pcfiles[1]),
+                                   ('blerg', blerg)])
+        self.assertEqual(searcher.search_for_pcfile('blag'), self.pcfiles)
+        self.assertEqual(searcher.search_for_pcfile('blerg'), [blerg])
+
+    def test_path_names(self):
+        searcher = PkgSearcher({'config_path': self.dirs[:1]})
+        self.assertEqual(searcher.search_for_pcfile(
+            os.path.join(self.dirs[1], 'blag')), [])
+        self.assertEqual(searcher.search_for_pcfile(
+            os.path.join('..', os.path.basename(self.dirs[1]), 'blag')), [])
+
+
 class TestSubstitutions(unittest.TestCase):
     def setUp(self):
         self.vars = {'blag1': 'not recursive',
@@ -141,6 +316,39 @@ class TestSubstitutions(unittest.TestCase):
         self.assertEqual(ret_code, 0)
 
 
+class TestEnv(unittest.TestCase):
+    name = 'PYKG_CONFIG_TEST_ENV'
+
+    def setUp(self):
+        self.old_value = os.environ.pop(self.name, None)
+
+    def tearDown(self):
+        os.environ.pop(self.name, None)
+        if self.old_value is not None:
+            os.environ[self.name] = self.old_value
+
+    def child_value(self):
+        stdout, stderr, ret_code = call_process((sys.executable, '-c',
+            'import os, sys; sys.stdout.write(os.environ.get(sys.argv[1], '
+            '"unset"))', self.name))
+        return stdout
+
+    def test_unset_variable(self):
+        with Env(**{self.name: 'blag'}):
+            self.assertEqual(os.environ[self.name], 'blag')
+            self.assertEqual(self.child_value(), 'blag')
+        self.assertFalse(self.name in os.environ)
+        self.assertEqual(self.child_value(), 'unset')
+
+    def test_set_variable(self):
+        os.environ[self.name] = 'blerg'
+        with Env(**{self.name: 'blag'}):
+            self.assertEqual(os.environ[self.name], 'blag')
+            self.assertEqual(self.child_value(), 'blag')
+        self.assertEqual(os.environ[self.name], 'blerg')
+        self.assertEqual(self.child_value(), 'blerg')
+
+
 class TestQuoteEscapes(unittest.TestCase):
 
     def test_maintain_escaping(self):